@@ -1,8 +1,9 @@
 import pkg_resources
 
 from .bmftc import Bmftc
+from .runensemble import run_ensemble
 
 __version__ = pkg_resources.get_distribution("bmftc").version
-__all__ = ["Bmftc"]
+__all__ = ["Bmftc", "run_ensemble"]
 
 del pkg_resources
\ No newline at end of file
@@ -13,22 +13,46 @@ with original CoLT Matlab code.
 Last updated _16 August 2022_ by _IRB Reeves_
 ----------------------------------------------------------------------"""
 
+import functools
 import numpy as np
 import scipy.io
-from scipy.integrate import solve_ivp
 import math
-import bisect
 import matplotlib.pyplot as plt
 
 from buildtransect import buildtransect
-from funBAY import funBAY
-from funBAY import POOLstopp5
+from funBAY import solveBAY
 from calcFE import calcFE
 from evolvemarsh import evolvemarsh
 from decompose import decompose
+from findboundyr import findboundyr
+from updateforest import updateforest
+from erodemarsh import erodestrat, floodmarsh
+
+
+@functools.lru_cache(maxsize=None)
+def _loadmat(filename):
+    """Loads a .mat input file once per process. The arrays are shared by every Bmftc instance that reads the file, so they are made read-only."""
+
+    mat = scipy.io.loadmat(filename)
+    for value in mat.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return mat
 
 
 class Bmftc:
+    # Fixed attribute layout: no per-instance __dict__, and attribute reads/writes (including the _x_b and _bfo updates made by coupled models) go through slots
+    __slots__ = (
+        "_name", "_RSLRi", "_RSLR", "_time_index", "_dt", "_dur", "_Coi", "_Co", "_slope", "_mwo", "_bfo", "_forest_width_initial_fixed", "_forest_width_initial",
+        "_startforestage", "_rhos", "_rhoo", "_P", "_ws", "_wsf", "_tcr", "_wind", "_amp", "_Ba", "_Be", "_lamda", "_dist", "_cyclestep", "_BMax", "_Dmin",
+        "_Bmax_forest", "_a", "_b", "_f0", "_fwet", "_fgrow", "_mui", "_mki", "_numiterations", "_Fm_min", "_Fm_org", "_Fp_sum", "_SLR", "_rhou", "_rhob", "_tr",
+        "_Dmax", "_elev25", "_min_25", "_orgAL_25", "_orgAT_25", "_forestOM", "_forestMIN", "_B_rts", "_startyear", "_endyear", "_msl", "_to", "_timestep", "_x_b",
+        "_x_m", "_Marsh_edge", "_Forest_edge", "_fetch", "_forest_on", "_tidal_dt", "_OCb", "_edge_flood", "_Edge_ht", "_marshOM_initial", "_marshMM_initial",
+        "_marshLOI_initial", "_marshOCP_initial", "_marshOC_initial", "_elevation", "_x_f", "_deposition",
+        "_forestage", "_Bay_depth", "_dmo", "_C_e_ODE", "_Fc_ODE", "_n_ODE", "_drown_break", "_Fow_min", "_mortality", "_BayExport", "_BayOM", "_BayMM", "_fluxes",
+        "_bgb_sum", "_Fd", "_avg_accretion", "_rhomt", "_massmt", "_C_e", "_aboveground_forest", "_OM_sum_au", "_OM_sum_al", "_BaySedDensity", "_db", "_B", "_B_minus_10"
+    )
+
     def __init__(
             self,
             name="default",
@@ -150,7 +174,7 @@ class Bmftc:
         self._Dmax = 0.7167 * 2 * self._amp - 0.483  # [m] Maximum depth below high water that marsh veg can grow
 
         # Load MarshStrat spin up file
-        marsh_spinup = scipy.io.loadmat(filename_marshspinup)
+        marsh_spinup = _loadmat(filename_marshspinup)
         self._elev25 = marsh_spinup["elev_25"]
         self._min_25 = marsh_spinup["min_25"]
         self._orgAL_25 = marsh_spinup["orgAL_25"]
@@ -158,11 +182,11 @@ class Bmftc:
 
         # Load Forest Organic Profile files: Look-up table with soil organic matter for forest based on age and depth
         directory_fop = "Input/PyBMFT-C/Forest_Organic_Profile"
-        file_forestOM = scipy.io.loadmat(directory_fop + "/forestOM.mat")  # [g] Table with forest organic matter profile stored in 25 depth increments of 2.5cm (rows) for forests of different ages (columns) from 1 to 80 years
+        file_forestOM = _loadmat(directory_fop + "/forestOM.mat")  # [g] Table with forest organic matter profile stored in 25 depth increments of 2.5cm (rows) for forests of different ages (columns) from 1 to 80 years
         self._forestOM = file_forestOM["forestOM"]
-        file_forestMIN = scipy.io.loadmat(directory_fop + "/forestMIN.mat")  # [g] Table with forest mineral matter profile stored in 25 depth increments of 2.5cm (rows) for forests of different ages (columns) from 1 to 80 years
+        file_forestMIN = _loadmat(directory_fop + "/forestMIN.mat")  # [g] Table with forest mineral matter profile stored in 25 depth increments of 2.5cm (rows) for forests of different ages (columns) from 1 to 80 years
         self._forestMIN = file_forestMIN["forestMIN"]
-        file_B_rts = scipy.io.loadmat(directory_fop + "/B_rts.mat")
+        file_B_rts = _loadmat(directory_fop + "/B_rts.mat")
         self._B_rts = file_B_rts["B_rts"]
 
         # Continue variable initializations
@@ -192,8 +216,8 @@ class Bmftc:
         self._edge_flood = np.zeros(self._endyear)  # Annual count of marsh edge cells flooded
         self._Edge_ht = np.zeros(self._endyear)  # [m] Height of marsh scarp above MHW
 
-        self._marshOM_initial = (np.sum(np.sum(self._orgAL_25)) + np.sum(np.sum(self._orgAT_25))) / 1000  # [kg] Total mass of organic matter in the marsh at the beginning of the simulation (both alloch and autoch)
-        self._marshMM_initial = np.sum(np.sum(self._min_25)) / 1000  # [kg] Total mass of mineral matter in the marsh at the beginning of the simulation
+        self._marshOM_initial = (self._orgAL_25.sum() + self._orgAT_25.sum()) / 1000  # [kg] Total mass of organic matter in the marsh at the beginning of the simulation (both alloch and autoch)
+        self._marshMM_initial = self._min_25.sum() / 1000  # [kg] Total mass of mineral matter in the marsh at the beginning of the simulation
         self._marshLOI_initial = self._marshOM_initial / (self._marshOM_initial + self._marshMM_initial) * 100  # [%] LOI of the initial marsh deposit
         self._marshOCP_initial = 0.4 * self._marshLOI_initial + 0.0025 * self._marshLOI_initial ** 2  # [%] Organic carbon content from Craft et al. (1991)
         self._marshOC_initial = self._marshOCP_initial / 100 * (self._marshOM_initial + self._marshMM_initial)  # [kg] Organic carbon deposited in the marsh over the past spinup years
@@ -201,22 +225,23 @@ class Bmftc:
         # Build starting transect
         self._B, self._db, self._elevation = buildtransect(self._RSLRi, self._Coi, self._slope, self._mwo, self._elev25, self._amp, self._wind, self._bfo, self._endyear, self._startyear, filename_equilbaydepth, self._forest_width_initial_fixed, self._forest_width_initial, plot=False)
 
-        # Find first forest cell x-location
-        self._x_f = bisect.bisect_left(self._elevation[self._startyear - 1, :], self._msl[self._startyear] + self._amp - self._Dmin + 0.03)  # First forest cell
-
-        # Set up vectors for deposition
-        self._organic_dep_alloch = np.zeros([self._endyear, self._B])
-        self._organic_dep_autoch = np.zeros([self._endyear, self._B])
-        self._mineral_dep = np.zeros([self._endyear, self._B])
-        self._organic_dep_alloch[:self._startyear, self._x_m: self._x_m + self._mwo] = self._orgAL_25  # Set spinup years to be the spin up values for deposition
-        self._organic_dep_autoch[:self._startyear, self._x_m: self._x_m + self._mwo] = self._orgAT_25
-        self._mineral_dep[:self._startyear, self._x_m: self._x_m + self._mwo] = self._min_25
+        self._B_minus_10 = self._B - 10  # Marsh edge position beyond which the marsh has retreated completely (end condition)
 
-        # Set options for ODE solver
-        POOLstopp5.terminal = True
+        # Find first forest cell x-location
+        self._x_f = int(np.searchsorted(self._elevation[self._startyear - 1, :], self._msl[self._startyear] + self._amp - self._Dmin + 0.03, side="left"))  # First forest cell
+
+        # Set up vectors for deposition: a single column-major [year, cell, component] array, so that the stratigraphy of a single cell through time is contiguous and all
+        # three components of a cell can be reduced in one operation. Components are 0: autochthonous organic, 1: allochthonous organic, 2: mineral. Stored in single
+        # precision (like the other [year, cell] mass records below) to halve memory traffic; elevation and sea level stay in double precision for threshold comparisons
+        # The per-component records (organic_dep_autoch, organic_dep_alloch, mineral_dep) are views taken from this array where they are used and are never stored as
+        # separate attributes, so they cannot become detached from it (e.g., when the model is pickled or copied)
+        self._deposition = np.zeros([self._endyear, self._B, 3], dtype=np.float32, order="F")
+        self._deposition[:self._startyear, self._x_m: self._x_m + self._mwo, 1] = self._orgAL_25  # Set spinup years to be the spin up values for deposition
+        self._deposition[:self._startyear, self._x_m: self._x_m + self._mwo, 0] = self._orgAT_25
+        self._deposition[:self._startyear, self._x_m: self._x_m + self._mwo, 2] = self._min_25
 
         # Calculate where elevation is right for the forest to start
-        self._Forest_edge[self._startyear - 1] = bisect.bisect_left(self._elevation[self._startyear - 1, :], self._msl[self._startyear - 1] + self._amp + self._Dmin)
+        self._Forest_edge[self._startyear - 1] = np.searchsorted(self._elevation[self._startyear - 1, :], self._msl[self._startyear - 1] + self._amp + self._Dmin, side="left")
         self._forestage = self._startforestage
 
         self._Bay_depth = np.zeros([self._endyear])
@@ -224,26 +249,27 @@ class Bmftc:
         self._dmo = self._elevation[self._startyear - 1, self._x_m]  # Set marsh edge depth to the elevation of the marsh edge at startyear
 
         # Initialize
-        self._C_e_ODE = []
-        self._Fc_ODE = []
+        self._C_e_ODE = np.empty(256)  # [kg/m3] SSC at marsh edge for each step of the ODE solver
+        self._Fc_ODE = np.empty(256)  # [kg/s] Net flux of sediment through tidal exchange for each step of the ODE solver
+        self._n_ODE = 0  # Number of ODE steps stored in _C_e_ODE and _Fc_ODE
         self._drown_break = 0
         self._Fow_min = 0  # [kg/yr] Annual net flux of mineral sediment into the bay from overwash
 
         # Initialize additional data storage arrays
-        self._mortality = np.zeros([self._endyear, self._B])
+        self._mortality = np.zeros([self._endyear, self._B], dtype=np.float32, order="F")
         self._BayExport = np.zeros([self._endyear, 2])
         self._BayOM = np.zeros([self._endyear])
         self._BayMM = np.zeros([self._endyear])
-        self._fluxes = np.zeros([8, self._endyear])
+        self._fluxes = np.zeros([8, self._endyear], order="F")  # Column-major, so that the eight fluxes stored for each year are contiguous
         self._bgb_sum = np.zeros([self._endyear])  # [g] Sum of organic matter deposited across the marsh platform in a given year
         self._Fd = np.zeros([self._endyear])  # [kg] Flux of organic matter out of the marsh due to decomposition
         self._avg_accretion = np.zeros([self._endyear])  # [m/yr] Annual accretion rate averaged across the marsh platform
         self._rhomt = np.zeros([self._dur])
         self._massmt = np.zeros([self._dur])
         self._C_e = np.zeros([self._endyear])
-        self._aboveground_forest = np.zeros([self._endyear, self._B])  # Forest aboveground biomass
-        self._OM_sum_au = np.zeros([self._endyear, self._B])
-        self._OM_sum_al = np.zeros([self._endyear, self._B])
+        self._aboveground_forest = np.zeros([self._endyear, self._B], dtype=np.float32, order="F")  # Forest aboveground biomass
+        self._OM_sum_au = np.zeros([self._endyear, self._B], dtype=np.float32, order="F")
+        self._OM_sum_al = np.zeros([self._endyear, self._B], dtype=np.float32, order="F")
         self._BaySedDensity = np.zeros([self._dur])
 
     def update(self):
@@ -252,23 +278,29 @@ class Bmftc:
         # Year including spinup
         yr = self._time_index + self._startyear
 
+        msl_yr = self._msl[yr]  # [m] Mean sea level for the current year
+        msl_prev = self._msl[yr - 1]  # [m] Mean sea level for the previous year
+        amp = self._amp
+        x_m = self._x_m  # Marsh edge at the start of the time step
+        organic_dep_autoch = self._deposition[:, :, 0]  # Views of the components of the depositional record
+        organic_dep_alloch = self._deposition[:, :, 1]
+        mineral_dep = self._deposition[:, :, 2]
+        OCb_prev = self._OCb[yr - 1]  # Organic content of bay sediment in the previous year
+        forest_thresh = msl_yr + amp - self._Dmin + 0.03  # [m] Elevation above which cells are forest
+        bay_el = msl_prev + amp - self._db  # [m] Elevation of bay bottom (i.e., depth of erosion), using bay depth from the start of the time step
+
         # Calculate the density of the marsh edge cell
-        try:
-            boundyr_list = [i for i, x in enumerate(self._elevation[:yr, self._x_m]) if x < (self._msl[yr - 1] + self._amp - self._db)]
-        except:
-            boundyr_list = []
-        if len(boundyr_list) >= 1:
-            boundyr = boundyr_list[-1] + 1  # Most recent year where elevation of marsh edge has just risen above depth of erosion (i.e., bay bottom elevation): this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
+        boundyr = findboundyr(self._elevation[:yr, x_m], bay_el)  # Most recent year where elevation of marsh edge has just risen above depth of erosion (i.e., bay bottom elevation): this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
+        if boundyr > 0:
             usmass = 0  # [kg] Mass of sediment underlying marsh at marsh edge
         else:
-            boundyr = 0
-            us = self._elevation[0, self._x_m] - (self._msl[yr - 1] + self._amp - self._db)
+            us = self._elevation[0, x_m] - bay_el
             usmass = us * self._rhou  # [kg] Mass of sediment underlying marsh at marsh edge
 
         # Mass of sediment to be eroded at the current marsh edge above the depth of erosion [kg], constrained by boundyr: this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
-        massm = np.sum(self._organic_dep_autoch[boundyr:, self._x_m]) / 1000 + np.sum(self._organic_dep_alloch[boundyr:, self._x_m]) / 1000 + np.sum(self._mineral_dep[boundyr:, self._x_m]) / 1000 + usmass
+        massm = self._deposition[boundyr:, x_m, :].sum(dtype=np.float64) / 1000 + usmass
         # Volume of sediment to be eroded at the current marsh edge above the depth of erosion [m3]
-        volm = self._elevation[yr - 1, self._x_m] - (self._msl[yr - 1] + self._amp - self._db)
+        volm = self._elevation[yr - 1, x_m] - bay_el
 
         rhom = massm / volm  # [kg/m3] Bulk density of marsh edge
         if rhom > self._rhos:
@@ -280,8 +312,15 @@ class Bmftc:
 
         Fm = (self._Fm_min + self._Fm_org) / (3600 * 24 * 365)  # [kg/s] Mass flux of both mineral and organic sediment from the bay to the marsh
 
-        # Parameters to feed into ODE
-        PAR = [
+        # ODE solves for change in bay depth and width
+        # IR 5July21: Small deviations in the solved values from the Matlab version (on the order of ~ 10^-4 to 10^-5)
+        X, self._C_e_ODE, self._Fc_ODE, self._n_ODE, success = solveBAY(
+            self._to,
+            np.array([self._bfo, self._db], dtype=np.float64),
+            10 ** (-6),
+            10 ** (-6),
+            self._C_e_ODE,
+            self._Fc_ODE,
             self._rhos,
             self._P,
             self._B,
@@ -299,59 +338,43 @@ class Bmftc:
             self._dmo,      # variable
             self._rhob,     # variable
             rhom,           # variable
-            self,
-        ]
+            self._db,
+        )
 
-        # ODE solves for change in bay depth and width
-        # IR 5July21: Small deviations in the solved values from the Matlab version (on the order of ~ 10^-4 to 10^-5)
-        try:
-            ode = solve_ivp(funBAY,
-                            t_span=self._to,
-                            y0=[self._bfo, self._db],
-                            atol=10 ** (-6),
-                            rtol=10 ** (-6),
-                            method='BDF',
-                            args=PAR,
-                            )
-
-            fetch_ODE = ode.y[0, :]
-            db_ODE = ode.y[1, :]
-        except ValueError:  # IR 25Feb22: Temprorary fix for rare ODE bug
-            print("  <-- ODE Value Error: RSLR", self.RSLRi, " Co", self._Coi)
-            fetch_ODE = [self._bfo]
-            db_ODE = [self._db]
-        except OverflowError:
-            print("  <-- ODE Overflow Error: RSLR", self.RSLRi, " Co", self._Coi)
-            fetch_ODE = [self._bfo]
-            db_ODE = [self._db]
-
-        self._db = db_ODE[-1]  # Set initial depth of the bay to final depth from funBAY
-        self._C_e[yr] = self._C_e_ODE[-1]  # SSC at marsh edge (kg/m3)
-
-        if self.x_b < 0:
-            x_b_int = math.floor(self._x_b)
-        else:
-            x_b_int = math.ceil(self._x_b)
+        if not success:  # IR 25Feb22: Temprorary fix for rare ODE bug
+            print("  <-- ODE Error: RSLR", self.RSLRi, " Co", self._Coi)
+            X = [self._bfo, self._db]
+        fetch_ODE = float(X[0])  # Python floats keep the math.ceil calls below off the numpy scalar path
+        db_ODE = float(X[1])
+
+        self._db = db_ODE  # Set initial depth of the bay to final depth from funBAY
+        bay_el = msl_prev + amp - self._db  # [m] Elevation of bay bottom (i.e., depth of erosion), using updated bay depth
+        bay_el_yr = msl_yr + amp - self._db  # [m] Elevation of bay bottom relative to current sea level
+        self._C_e[yr] = self._C_e_ODE[self._n_ODE - 1]  # SSC at marsh edge (kg/m3)
+
+        x_b_trunc = int(self._x_b)
+        x_b_int = x_b_trunc + (self._x_b > x_b_trunc) - (self._x_b < x_b_trunc)  # Round bay cell away from zero without branching (ceil if positive, floor if negative)
 
-        target_x_m = math.ceil(fetch_ODE[-1]) + x_b_int  # New (potential) first marsh cell
+        target_x_m = math.ceil(fetch_ODE) + x_b_int  # New (potential) first marsh cell
         if target_x_m >= self._x_f:  # Forest or bayside barrier edge (i.e., upland MHW shoreline) cannot erode from bay processes
             self._bfo = self._bfo + (self._x_f - self._x_m) - 1  # Marsh edge can't be greater than or equal to forest edge
         else:
-            self._bfo = fetch_ODE[-1]  # Set new fetch from funBAY
+            self._bfo = fetch_ODE  # Set new fetch from funBAY
 
-        Fc = self._Fc_ODE[-1] * 3600 * 24 * 365  # [kg/yr] Annual net flux of sediment out of/into the bay from outside the system
-        Fc_org = Fc * self._OCb[yr - 1]  # [kg/yr] Annual net flux of organic sediment out of/into the bay from outside the system
-        Fc_min = Fc * (1 - self._OCb[yr - 1])  # [kg/yr] Annual net flux of mineral sediment out of/into the bay from outside the system
+        Fc = self._Fc_ODE[self._n_ODE - 1] * 3600 * 24 * 365  # [kg/yr] Annual net flux of sediment out of/into the bay from outside the system
+        Fc_org = Fc * OCb_prev  # [kg/yr] Annual net flux of organic sediment out of/into the bay from outside the system
+        Fc_min = Fc * (1 - OCb_prev)  # [kg/yr] Annual net flux of mineral sediment out of/into the bay from outside the system
 
         # Calculate the flux of organic and mineral sediment to the bay from erosion of the marsh
-        Fe_org, Fe_min = calcFE(self._bfo, self._fetch[yr - 1], self._elevation, yr, self._organic_dep_autoch, self._organic_dep_alloch, self._mineral_dep, self._rhou, self._x_b, self._msl, self._amp, self._db)
+        Fe_org, Fe_min = calcFE(self._bfo, self._fetch[yr - 1], self._elevation, yr, organic_dep_autoch, organic_dep_alloch, mineral_dep, self._rhou, self._x_b, self._msl, self._amp, self._db)
         Fe_org /= 1000  # [kg/yr] Annual net flux of organic sediment to the bay due to erosion
         Fe_min /= 1000  # [kg/yr] Annual net flux of mineral sediment to the bay due to erosion
 
         Fb_org = Fe_org - self._Fm_org - Fc_org  # [kg/yr] Net flux of organic sediment into (or out of, if negative) the bay
         Fb_min = Fe_min - self._Fm_min - Fc_min + self._Fow_min  # [kg/yr] Net flux of mineral sediment into (or out of, if negative) the bay
 
-        self._BayExport[yr, :] = [Fc_org, Fc_min]  # [kg/yr] Mass of organic and mineral sediment exported from the bay each year
+        self._BayExport[yr, 0] = Fc_org  # [kg/yr] Mass of organic sediment exported from the bay each year
+        self._BayExport[yr, 1] = Fc_min  # [kg/yr] Mass of mineral sediment exported from the bay each year
         self._BayOM[yr] = Fb_org  # [kg/yr] Mass of organic sediment stored in the bay in each year
         self._BayMM[yr] = Fb_min  # [kg/yr] Mass of mineral sediment stored in the bay in each year
 
@@ -372,52 +395,39 @@ class Bmftc:
 
         self._OCb[yr] = 0.05  # IR hardwired 20Apr22: prevents OCb from getting really large over long (>150 yr) runs
 
-        self._rhob = 1 / ((1 - self._OCb[yr - 1]) / self._rhos + self._OCb[yr - 1] / self._rhoo)  # [kg/m3] Density of bay sediment
+        self._rhob = 1 / ((1 - OCb_prev) / self._rhos + OCb_prev / self._rhoo)  # [kg/m3] Density of bay sediment
 
         if int(self._bfo) <= 10:
-            self._drown_break = 1
-            print("PyBMFT-C: Marsh has completely filled the basin.")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Marsh has completely filled the basin.")
             return  # Exit program
 
-        self._x_m = math.ceil(self._bfo) + x_b_int  # New first marsh cell
-        try:
-            self._x_f = max(self._x_m + 1, np.where(self._elevation[yr - 1, :] > self._msl[yr] + self._amp - self._Dmin + 0.03)[0][0])
-        except IndexError:
+        x_m = self._x_m = math.ceil(self._bfo) + x_b_int  # New first marsh cell
+        upland = self._elevation[yr - 1, :] > forest_thresh
+        x_upland = int(upland.argmax())  # First cell above the forest elevation threshold, or 0 if there is none
+        if upland[x_upland]:
+            self._x_f = x_upland if x_upland > x_m else x_m + 1  # Forest edge can't be less than or equal to marsh edge
+        else:
             self._x_f = self._B
-            self._drown_break = 1  # If x_f can't be found, barrier has drowned
-            print("PyBMFT-C: Barrier has drowned.")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Barrier has drowned.")  # If x_f can't be found, barrier has drowned
             return  # Exit program
 
-        tempelevation = self._elevation[yr - 1, self._x_m: self._x_f + 1]
-        Dcells = int(self._Marsh_edge[yr - 1] - self._x_m)  # Gives the change in the number of marsh cells
+        tempelevation = self._elevation[yr - 1, x_m: self._x_f + 1]
+        Dcells = int(self._Marsh_edge[yr - 1] - x_m)  # Gives the change in the number of marsh cells
 
         if Dcells > 0:  # Prograde the marsh, with new marsh cells having the same elevation as the previous marsh edge
             tempelevation[0: int(Dcells)] = self._elevation[yr - 1, int(self._Marsh_edge[yr - 1])]
             # Account for mineral and organic material deposited in new marsh cells: this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
             new_marsh_height = self._db  # New marsh deposited up to MHW
-            total_mass_dep = new_marsh_height / (((1 - self._OCb[yr - 1]) / (self._rhos * 1000)) + (self._OCb[yr - 1] / (self._rhoo * 1000)))  # [g] Total mass to be deposited as new marsh in previous bay cell(s)
-            min_mass_dep = total_mass_dep * (1 - self._OCb[yr - 1])  # [g] Mass of mineral sediment deposited in new marsh cell from marsh edge progradation
-            org_mass_dep = total_mass_dep * self._OCb[yr - 1]  # [g] Mass of organic sediment deposited in new marsh cell from marsh edge progradation
-            self._mineral_dep[yr, self._x_m: self._x_m + Dcells] += min_mass_dep
-            self._organic_dep_alloch[yr, self._x_m: self._x_m + Dcells] += org_mass_dep
+            total_mass_dep = new_marsh_height / (((1 - OCb_prev) / (self._rhos * 1000)) + (OCb_prev / (self._rhoo * 1000)))  # [g] Total mass to be deposited as new marsh in previous bay cell(s)
+            min_mass_dep = total_mass_dep * (1 - OCb_prev)  # [g] Mass of mineral sediment deposited in new marsh cell from marsh edge progradation
+            org_mass_dep = total_mass_dep * OCb_prev  # [g] Mass of organic sediment deposited in new marsh cell from marsh edge progradation
+            mineral_dep[yr, x_m: x_m + Dcells] += min_mass_dep
+            organic_dep_alloch[yr, x_m: x_m + Dcells] += org_mass_dep
             Fm_min_prog = (min_mass_dep + Dcells) / 1000  # [kg/yr] Flux of mineral sediment from the bay from marsh edge progradation
             Fm_org_prog = (org_mass_dep + Dcells) / 1000  # [kg/yr] Flux of organic sediment from the bay from marsh edge progradation
         elif Dcells < 0:  # Marsh eroded
             # Account for negative deposition (i.e., erosion) in stratigraphic record: this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
-            for k in range(1, abs(Dcells) + 1):
-                try:
-                    boundyr_list = [i for i, x in enumerate(self._elevation[:yr, self._x_m - k]) if x < (self._msl[yr - 1] + self._amp - self._db)]
-                except:
-                    boundyr_list = []
-                if len(boundyr_list) >= 1:
-                    boundyr = boundyr_list[-1] + 1  # Most recent year where elevation of marsh edge has just risen above depth of erosion (i.e., bay bottom elevation)
-                else:
-                    boundyr = 0
-                self._organic_dep_autoch[yr, self._x_m - k] -= np.sum(self._organic_dep_autoch[boundyr:, self._x_m - k])  # Subtract eroded mass from depositional record
-                self._organic_dep_alloch[yr, self._x_m - k] -= np.sum(self._organic_dep_alloch[boundyr:, self._x_m - k])  # Subtract eroded mass from depositional record
-                self._mineral_dep[yr, self._x_m - k] -= np.sum(self._mineral_dep[boundyr:, self._x_m - k])  # Subtract eroded mass from depositional record
+            erodestrat(self._deposition, self._elevation, x_m + Dcells, x_m, yr, bay_el)  # Subtract mass above the depth of erosion from the depositional record of the eroded marsh cells
             Fm_min_prog = 0
             Fm_org_prog = 0
         else:
@@ -425,15 +435,16 @@ class Bmftc:
             Fm_org_prog = 0
 
         # Update bay depth
-        self._elevation[yr, :self._x_m] = self._msl[yr] + self._amp - self._db  # All bay cells have the same depth
+        self._elevation[yr, :x_m] = bay_el_yr  # All bay cells have the same depth
 
         # Add (or subtract) bay deposition: this is an ALTERATION/NEW ADDITION not included in original Matlab CoLT version
-        db_change = (self._msl[yr] + self._amp - self._db) - (self._msl[yr - 1] + self._amp - self._Bay_depth[yr - 1])  # [m] Change in bay depth for this year
-        total_mass_dep = db_change / (((1 - self._OCb[yr - 1]) / (self._rhos * 1000)) + (self._OCb[yr - 1] / (self._rhoo * 1000)))  # [g] Total mass to be deposited in bay cells
-        min_mass_dep = total_mass_dep * (1 - self._OCb[yr - 1])  # [g] Mass of mineral sediment deposited in bay cells
-        org_mass_dep = total_mass_dep * self._OCb[yr - 1]  # [g] Mass of organic sediment deposited in bay cells
-        self._mineral_dep[yr, x_b_int: self._x_m] += min_mass_dep
-        self._organic_dep_alloch[yr, x_b_int: self._x_m] += org_mass_dep
+        db_change = bay_el_yr - (msl_prev + amp - self._Bay_depth[yr - 1])  # [m] Change in bay depth for this year
+        if abs(db_change) > 1e-9:  # Skip writing to every bay cell if the bay bottom has not moved
+            total_mass_dep = db_change / (((1 - OCb_prev) / (self._rhos * 1000)) + (OCb_prev / (self._rhoo * 1000)))  # [g] Total mass to be deposited in bay cells
+            min_mass_dep = total_mass_dep * (1 - OCb_prev)  # [g] Mass of mineral sediment deposited in bay cells
+            org_mass_dep = total_mass_dep * OCb_prev  # [g] Mass of organic sediment deposited in bay cells
+            mineral_dep[yr, x_b_int: x_m] += min_mass_dep
+            organic_dep_alloch[yr, x_b_int: x_m] += org_mass_dep
 
         # Mineral and organic marsh deposition
         (
@@ -450,7 +461,7 @@ class Bmftc:
             tempelevation,
             self._msl[yr],
             self._C_e[yr],
-            self._OCb[yr - 1],
+            OCb_prev,
             self._tr,
             self._numiterations,
             self._P,
@@ -465,47 +476,47 @@ class Bmftc:
             plot=False
         )
 
-        self._elevation[yr, self._x_m: self._x_f + 1] = tempelevation  # [m] Set new elevation to current year
+        self._elevation[yr, x_m: self._x_f + 1] = tempelevation  # [m] Set new elevation to current year
         self._elevation[yr, self._x_f + 1: self._B] = self._elevation[yr - 1, self._x_f + 1: self._B]  # Forest elevation remains unchanged
-        self._mineral_dep[yr, self._x_m: self._x_f + 1] += tempmin  # [g] Mineral sediment deposited in a given year
-        self._organic_dep_autoch[yr, self._x_m: self._x_f + 1] = temporg_autoch  # [g] Belowground plant material deposited in a given year
-        self._mortality[yr, self._x_m: self._x_f + 1] = temporg_autoch  # [g] Belowground plant material deposited in a given year, for keeping track of without decomposition
-        self._organic_dep_alloch[yr, self._x_m: self._x_f + 1] = temporg_alloch  # [g] Allochthonous organic material deposited in a given year
-        self._bgb_sum[yr] = np.sum(tempbgb)  # [g] Belowground biomass deposition summed across the marsh platform. Saved through time without decomposition for analysis
+        mineral_dep[yr, x_m: self._x_f + 1] += tempmin  # [g] Mineral sediment deposited in a given year
+        organic_dep_autoch[yr, x_m: self._x_f + 1] = temporg_autoch  # [g] Belowground plant material deposited in a given year
+        self._mortality[yr, x_m: self._x_f + 1] = temporg_autoch  # [g] Belowground plant material deposited in a given year, for keeping track of without decomposition
+        organic_dep_alloch[yr, x_m: self._x_f + 1] = temporg_alloch  # [g] Allochthonous organic material deposited in a given year
+        self._bgb_sum[yr] = tempbgb.sum()  # [g] Belowground biomass deposition summed across the marsh platform. Saved through time without decomposition for analysis
 
         self._Fm_min += Fm_min_prog  # [kg/yr] Add fluxes deposited at marsh edge to fluxes deposited on marsh platform
         self._Fm_org += Fm_org_prog  # [kg/yr] Add fluxes deposited at marsh edge to fluxes deposited on marsh platform
 
-        try:
-            self._x_f = max(self._x_m + 1, np.where(self._elevation[yr - 1, :] > self._msl[yr] + self._amp - self._Dmin + 0.03)[0][0])
-        except IndexError:
+        upland = self._elevation[yr - 1, :] > forest_thresh
+        x_upland = int(upland.argmax())  # First cell above the forest elevation threshold, or 0 if there is none
+        if upland[x_upland]:
+            self._x_f = x_upland if x_upland > x_m else x_m + 1  # Forest edge can't be less than or equal to marsh edge
+        else:
             self._x_f = self._B
-            self._drown_break = 1  # If x_f can't be found, barrier has drowned
-            print("PyBMFT-C: Barrier has drowned.")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Barrier has drowned.")  # If x_f can't be found, barrier has drowned
             return  # Exit program
 
         if self._forest_on:
             # Update forest soil organic matter
-            spinlast25 = self._startyear - 25
             self._forestage += 1  # Age the forest
-            for x in range(int(self._Forest_edge[yr - 1]), self._x_f + 1):
-                if self._forestage < 80:
-                    self._organic_dep_autoch[self._startyear - 25: self._startyear, x] = self._forestOM[:, yr - spinlast25] + self._B_rts[:, yr - spinlast25]
-                else:
-                    self._organic_dep_autoch[self._startyear - 25: self._startyear, x] = self._forestOM[:, 79] + self._B_rts[:, 79]
-            for x in range(self._x_f, self._B):
-                if self._forestage < 80:
-                    self._organic_dep_autoch[self._startyear - 25: self._startyear, x] = self._forestOM[:, yr - spinlast25]
-                    self._mineral_dep[self._startyear - 25: self._startyear, x] = self._forestMIN[:, yr - spinlast25]
-                else:
-                    self._organic_dep_autoch[self._startyear - 25: self._startyear, x] = self._forestOM[:, 79]
-                    self._mineral_dep[self._startyear - 25: self._startyear, x] = self._forestMIN[:, 79]
+            updateforest(
+                organic_dep_autoch,
+                mineral_dep,
+                self._forestOM,
+                self._forestMIN,
+                self._B_rts,
+                int(self._Forest_edge[yr - 1]),
+                self._x_f,
+                self._B,
+                self._startyear,
+                yr,
+                self._forestage,
+            )
 
             df = -self._msl[yr] + self._elevation[yr, self._x_f: self._B]
 
-            self._organic_dep_autoch[yr, self._x_f: self._B] = self._f0 + self._fwet * np.exp(-self._fgrow * df)
-            self._mineral_dep[yr, self._x_f: self._B] = self._forestMIN[0, 79]
+            organic_dep_autoch[yr, self._x_f: self._B] = self._f0 + self._fwet * np.exp(-self._fgrow * df)
+            mineral_dep[yr, self._x_f: self._B] = self._forestMIN[0, 79]
 
             # Update forest aboveground biomass
             self._aboveground_forest[yr, self._x_f: self._B] = self._Bmax_forest / (1 + self._a * np.exp(-self._b * df))
@@ -513,12 +524,12 @@ class Bmftc:
         (
             compaction,
             tempFd,
-            self._organic_dep_autoch,
+            organic_dep_autoch,
         ) = decompose(
-            self._x_m,
+            x_m,
             self._x_f,
             yr,
-            self._organic_dep_autoch,
+            organic_dep_autoch,
             self._elevation,
             self._B,
             self._mui,
@@ -529,53 +540,39 @@ class Bmftc:
         self._Fd[yr] = tempFd  # [kg] Flux of organic matter out of the marsh due to decomposition
 
         # Adjust marsh and forest elevation due to compaction from decomposition
-        self._elevation[yr, self._x_m: self._B] -= compaction[self._x_m: self._B]
-        self._OM_sum_au[yr, :len(self._elevation) + 1] = np.sum(self._organic_dep_autoch[:yr + 1, :])
-        self._OM_sum_al[yr, :len(self._elevation) + 1] = np.sum(self._organic_dep_alloch[:yr + 1, :])
-
-        F = 0
-        while self._x_m < self._B and self._x_m < self._x_f:
-            if self._organic_dep_autoch[yr, self._x_m] > 0 or (self._msl[yr] + self._amp - self._elevation[yr, self._x_m]) < self._Dmax:
-                break
-            else:  # Otherwise, the marsh has drowned, and will be eroded to form new bay
-                F = 1
-                self._edge_flood[yr] += 1  # Count that cell as a flooded cell
-                self._bfo += 1  # Increase the bay fetch by one cell
-                try:
-                    boundyr_list = [i for i, x in enumerate(self._elevation[:yr, self._x_m]) if x < (self._msl[yr - 1] + self._amp - self._db)]
-                except:
-                    boundyr_list = []
-                if len(boundyr_list) >= 1:
-                    boundyr = boundyr_list[-1] + 1  # Most recent year where elevation of marsh edge has just risen above depth of erosion (i.e., bay bottom elevation)
-                else:
-                    boundyr = 0
-                self._organic_dep_autoch[yr, self._x_m] -= np.sum(self._organic_dep_autoch[boundyr:, self._x_m])  # Subtract eroded mass from depositional record
-                self._organic_dep_alloch[yr, self._x_m] -= np.sum(self._organic_dep_alloch[boundyr:, self._x_m])  # Subtract eroded mass from depositional record
-                self._mineral_dep[yr, self._x_m] -= np.sum(self._mineral_dep[boundyr:, self._x_m])  # Subtract eroded mass from depositional record
-                self._x_m += 1  # Update the new location of the marsh edge
-
-        self._x_f = max(self._x_m + 1, self._x_f)  # "Forest" edge can't be less than or equal to marsh edge
+        self._elevation[yr, x_m: self._B] -= compaction[x_m: self._B]
+        OM_sum = self._deposition[:yr + 1, :, :2].sum(axis=0)  # [g] Autochthonous and allochthonous organic matter stored in each cell, reduced together in one pass
+        self._OM_sum_au[yr, :] = OM_sum[:, 0]  # [g] Autochthonous organic matter stored in each cell
+        self._OM_sum_al[yr, :] = OM_sum[:, 1]  # [g] Allochthonous organic matter stored in each cell
+
+        # Erode drowned cells at the marsh edge to form new bay
+        self._x_m, flooded = floodmarsh(self._deposition, self._elevation, self._x_m, self._x_f, self._B, yr, msl_yr, amp, self._Dmax, bay_el)
+        F = 1 if flooded > 0 else 0
+        self._edge_flood[yr] += flooded  # Count of flooded cells
+        self._bfo += flooded  # Increase the bay fetch by one cell for each flooded cell
+
+        if self._x_f <= self._x_m:  # "Forest" edge can't be less than or equal to marsh edge
+            self._x_f = self._x_m + 1
 
         if F == 1:  # If flooding occurred, adjust marsh flux
             # Calculate the amount of organic and mineral sediment liberated from the flooded cells
-            FF_org, FF_min = calcFE(self._bfo, self._fetch[yr - 1], self._elevation, yr, self._organic_dep_autoch, self._organic_dep_alloch, self._mineral_dep, self._rhou, self._x_b, self._msl, self._amp, self._db)
+            FF_org, FF_min = calcFE(self._bfo, self._fetch[yr - 1], self._elevation, yr, organic_dep_autoch, organic_dep_alloch, mineral_dep, self._rhou, self._x_b, self._msl, self._amp, self._db)
             # Adjust flux of mineral sediment to the marsh
             self._Fm_min -= FF_min
             # Adjust flux of organic sediment to the marsh
             self._Fm_org -= FF_org
-            # Change the drowned marsh cell to z bay cell
-            self._elevation[yr, :self._x_m] = self._elevation[yr, 0]
-
-        self._fluxes[:, yr] = [
-            Fe_min,
-            Fe_org,
-            self._Fm_min,
-            self._Fm_org,
-            Fc_min,
-            Fc_org,
-            Fb_min,
-            Fb_org,
-        ]
+            # Change the drowned marsh cells to bay cells: cells seaward of the flooded ones were already set to the bay depth above, so only the flooded cells are written
+            self._elevation[yr, self._x_m - flooded: self._x_m].fill(self._elevation[yr, 0])
+
+        fluxes = self._fluxes
+        fluxes[0, yr] = Fe_min
+        fluxes[1, yr] = Fe_org
+        fluxes[2, yr] = self._Fm_min
+        fluxes[3, yr] = self._Fm_org
+        fluxes[4, yr] = Fc_min
+        fluxes[5, yr] = Fc_org
+        fluxes[6, yr] = Fb_min
+        fluxes[7, yr] = Fb_org
 
         # Update inputs for marsh edge
         self._Marsh_edge[yr] = self._x_m
@@ -587,30 +584,21 @@ class Bmftc:
             self._dmo = self._msl[yr] + self._amp - self._elevation[yr, self._x_m]
             self._Edge_ht[yr] = self._dmo
         elif int(self._bfo) <= 10:  # Condition for if the marsh has expanded to fill the basin
-            self._drown_break = 1
-            print("PyBMFT-C: Marsh has completely filled the basin")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Marsh has completely filled the basin")
             return  # Exit program
         elif self._x_m <= 10:  # Another condition for if the marsh has expanded to fill the basin
-            self._drown_break = 1
-            print("PyBMFT-C: Marsh has expanded to fill the basin.")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Marsh has expanded to fill the basin.")
             return  # Exit program
-        elif self._x_m >= len(self._elevation[0, :]) - 10:  # Condition for if the marsh has eroded completely away
-            self._drown_break = 1
-            print("PyBMFT-C: Marsh has retreated. Basin is completely flooded.")
-            self._endyear = yr
+        elif self._x_m >= self._B_minus_10:  # Condition for if the marsh has eroded completely away
+            self._handle_drown(yr, "PyBMFT-C: Marsh has retreated. Basin is completely flooded.")
             return  # Exit program
         elif self._db < 0.2:  # Condition for if the bay gets very shallow. Should this number be calculated within the code?
-            self._drown_break = 1
-            print("PyBMFT-C: Bay has filled in to form marsh.")
-            self._endyear = yr
+            self._handle_drown(yr, "PyBMFT-C: Bay has filled in to form marsh.")
             return  # Exit program
 
         self._fetch[yr] = self._bfo  # Save change in bay fetch through time
 
-        self._Fc_ODE = []
-        self._C_e_ODE = []
+        self._n_ODE = 0  # Mark the ODE trace buffers as empty; the buffers themselves are kept and reused by the next step
 
         # Increase time
         self._time_index += 1
@@ -618,6 +606,13 @@ class Bmftc:
         # TIME STEP COMPLETE
         # ==========================================================================================================================================================================
 
+    def _handle_drown(self, yr, message):
+        """Ends the simulation at year yr because one of the end conditions (drowning or filling of the basin) was met"""
+
+        self._drown_break = 1
+        print(message)
+        self._endyear = yr
+
     @property
     def time_index(self):
         return self._time_index
@@ -628,7 +623,7 @@ class Bmftc:
 
     @property
     def organic_dep_autoch(self):
-        return self._organic_dep_autoch
+        return self._deposition[:, :, 0]
 
     @property
     def x_m(self):
@@ -640,7 +635,7 @@ class Bmftc:
 
     @property
     def organic_dep_alloch(self):
-        return self._organic_dep_alloch
+        return self._deposition[:, :, 1]
 
     @property
     def endyear(self):
@@ -648,7 +643,7 @@ class Bmftc:
 
     @property
     def mineral_dep(self):
-        return self._mineral_dep
+        return self._deposition[:, :, 2]
 
     @property
     def elevation(self):
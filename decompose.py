@@ -6,8 +6,10 @@ Last updated _5 July 2021_ by _IRB Reeves_
 
 import numpy as np
 import math
+from numba import njit
 
 
+@njit(cache=True)
 def decompose(
         x_m,
         x_f,
@@ -21,21 +23,21 @@ def decompose(
 ):
     """Decomposes all of the organic sediment within the marsh soil profile at a rate determined by depth."""
 
-    compaction = np.zeros([B])
-    Fd = 0
+    compaction = np.zeros(B)
+    Fd = 0.0
 
     # Decompose the marsh sediment
     for x in range(x_m, x_f):  # Loop through each marsh and upland cell in the domain
-        decomp = np.zeros([yr + 1])
+        decomp_sum = 0.0
         for tempyr in range(yr, 0, -1):  # Loop through each pocket of sediment in each cell, starting at the most recently deposited packet of sediment at the surface
             depth = elevation[yr, x] - elevation[tempyr, x]  # Depth of sediment pocket below the surface
             if depth > mui:  # Maximum depth at which decomposition occurs
-                decomp[tempyr] = 0
                 break
             else:
-                decomp[tempyr] = organic_dep_autoch[tempyr, x] * (mki * math.exp(-depth / mui))  # [g] Mass of organic material decomposed from a given "pocket" of sediment
-                organic_dep_autoch[tempyr, x] -= decomp[tempyr]  # [g] Autochthanous organic material in a given "pocket" of sediment updated for deomposition
-        compaction[x] = np.sum(decomp) / 1000 / rhoo  # [m] Total compaction in a given cell is a result of the sum of all decomposition in that cell
-        Fd += np.sum(decomp)  # [kg] Flux of organic matter out of the marsh due to decomposition
+                decomp = organic_dep_autoch[tempyr, x] * (mki * math.exp(-depth / mui))  # [g] Mass of organic material decomposed from a given "pocket" of sediment
+                organic_dep_autoch[tempyr, x] -= decomp  # [g] Autochthanous organic material in a given "pocket" of sediment updated for deomposition
+                decomp_sum += decomp
+        compaction[x] = decomp_sum / 1000 / rhoo  # [m] Total compaction in a given cell is a result of the sum of all decomposition in that cell
+        Fd += decomp_sum  # [kg] Flux of organic matter out of the marsh due to decomposition
 
     return compaction, Fd, organic_dep_autoch
@@ -0,0 +1,45 @@
+"""----------------------------------------------------------------------
+PyBMFT-C: Bay-Marsh-Forest Transect Carbon Model (Python version)
+----------------------------------------------------------------------"""
+
+from numba import njit
+
+from findboundyr import findboundyr
+
+
+@njit(cache=True)
+def erodestrat(deposition, elevation, x1, x2, yr, bay_el):
+    """Removes the deposits lying above the depth of erosion (bay_el) from the stratigraphic record of each marsh cell from x1 to x2 (exclusive) by subtracting
+    their mass in the current year. deposition is the [year, cell, component] record of autochthonous organic, allochthonous organic, and mineral deposition."""
+
+    for x in range(x1, x2):
+        boundyr = findboundyr(elevation[:yr, x], bay_el)  # Most recent year where elevation of the cell has just risen above depth of erosion (i.e., bay bottom elevation)
+
+        # Sum all three components in a single pass over the cell's stratigraphy
+        s0 = 0.0
+        s1 = 0.0
+        s2 = 0.0
+        for i in range(boundyr, yr + 1):
+            s0 += deposition[i, x, 0]
+            s1 += deposition[i, x, 1]
+            s2 += deposition[i, x, 2]
+        deposition[yr, x, 0] -= s0  # [g] Subtract eroded mass from depositional record
+        deposition[yr, x, 1] -= s1
+        deposition[yr, x, 2] -= s2
+
+
+@njit(cache=True)
+def floodmarsh(deposition, elevation, x_m, x_f, B, yr, msl, amp, Dmax, bay_el):
+    """Converts drowned cells at the marsh edge to bay: starting at the marsh edge (x_m), each cell with no autochthonous organic deposition in the current year
+    and a depth below mean high water of at least Dmax is eroded to the depth of erosion (bay_el). Returns the new marsh edge and the number of flooded cells."""
+
+    flooded = 0
+    while x_m < B and x_m < x_f:
+        if deposition[yr, x_m, 0] > 0 or (msl + amp - elevation[yr, x_m]) < Dmax:
+            break
+        # Otherwise, the marsh has drowned, and will be eroded to form new bay
+        erodestrat(deposition, elevation, x_m, x_m + 1, yr, bay_el)
+        flooded += 1  # Count that cell as a flooded cell
+        x_m += 1  # Update the new location of the marsh edge
+
+    return x_m, flooded
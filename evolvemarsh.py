@@ -7,6 +7,7 @@ Last updated _20 April 2022_ by _IRB Reeves_
 import numpy as np
 import math
 import matplotlib.pyplot as plt
+from numba import njit
 
 
 def evolvemarsh(
@@ -30,19 +31,82 @@ def evolvemarsh(
     """Calculates biomass and mineral and organic deposition for each cell in the marsh as a function of flooding
     frequency; calculates the total flux of sediment onto the marsh from the bay."""
 
+    if plot:
+        initialelevation = marshelevation.copy()
+
+    (
+        marshelevation,
+        organic_autoch,
+        organic_alloch,
+        mineral,
+        Fm_min,
+        Fm_org,
+        bgb,
+        accretion,
+        agb,
+        C,
+        susp_dep,
+    ) = _evolvemarsh(marshelevation, msl, C_e, OCb, tr, numiterations, P, dt, ws, timestep, BMax, Dmin, Dmax, rhoo, rhos)
+
+    if plot:
+        # Mineral sediment deposited in each cell over each iteration of the tidal cycle
+        tide = 0.5 * tr * np.sin(2 * math.pi * (np.arange(1, numiterations + 1) * dt / P))
+        tide[0] = -np.inf  # First iteration is not included in the tidal cycle
+        depth = tide[:, np.newaxis] + (msl - initialelevation)
+        sedimentcycle = np.where(depth > 0, C * ws * dt, 0)
+
+        plt.figure()
+        plt.subplot(3, 1, 1)
+        plt.plot(np.transpose(sedimentcycle))
+        plt.xlabel("Distance Across Marsh [m]")
+        plt.ylabel("Mineral Sediment Deposited Per Cycle [g/cycle]")
+        plt.subplot(3, 1, 2)
+        plt.plot(C)
+        plt.xlabel("Distance Across Marsh [m]")
+        plt.ylabel("Suspended Sediment Concentration [kg/m3]")
+        plt.subplot(3, 1, 3)
+        plt.plot(susp_dep)
+        plt.xlabel("Distance Across Marsh [m]")
+        plt.ylabel("Suspended Sediment Deposition [g/yr]")
+        plt.show()
+
+    return marshelevation, organic_autoch, organic_alloch, mineral, Fm_min, Fm_org, bgb, accretion, agb
+
+
+@njit(cache=True)
+def _evolvemarsh(
+        marshelevation,
+        msl,
+        C_e,
+        OCb,
+        tr,
+        numiterations,
+        P,
+        dt,
+        ws,
+        timestep,
+        BMax,
+        Dmin,
+        Dmax,
+        rhoo,
+        rhos,
+):
+    """Compiled kernel of evolvemarsh. Also returns the suspended sediment concentration and the annual suspended sediment deposition in each cell for plotting."""
+
     L = len(marshelevation)
-    time_submerged = np.zeros([numiterations, L])
-    sedimentcycle = np.zeros([numiterations, L])
-    depth = np.zeros([numiterations, L])
-    C = np.zeros([L])
+    C = np.zeros(L)
 
-    # Loop through a tidal cycle to determine flooding duration for each point in the marsh
+    # Tidal water level at each iteration of a tidal cycle
+    tide = np.empty(numiterations)
     for i in range(1, numiterations):
-        depth_iteration = 0.5 * tr * math.sin(2 * math.pi * ((i + 1) * dt / P)) + (msl - marshelevation[0: L + 1])  # [m] Depth at each position in the marsh
-        depth[i, :] = depth_iteration  # Store depths in array
-        temp = np.zeros([L])
-        temp[depth_iteration > 0] = dt
-        time_submerged[i, :] = temp  # Inundation for a single flood cycle recorded for each cell
+        tide[i] = 0.5 * tr * math.sin(2 * math.pi * ((i + 1) * dt / P))
+
+    # Count the iterations of the tidal cycle during which each point in the marsh is flooded
+    submerged = np.zeros(L)
+    for xx in range(L):
+        for i in range(1, numiterations):
+            if tide[i] + (msl - marshelevation[xx]) > 0:  # [m] Depth at each position in the marsh
+                submerged[xx] += 1
 
     # -------------------------
     # Belowground Productivity
@@ -51,9 +115,9 @@ def evolvemarsh(
 
     dm = msl + tr / 2 - marshelevation  # [m] Depth of the marsh surface below HWL at any given point
 
-    bgb = np.zeros([L])  # Belowground biomass
-    agb = np.zeros([L])  # Aboveground biomass
-    organic_autoch = np.zeros([L])  # Autochthonous organic material
+    bgb = np.zeros(L)  # Belowground biomass
+    agb = np.zeros(L)  # Aboveground biomass
+    organic_autoch = np.zeros(L)  # Autochthonous organic material
 
     for ii in range(L):
         if dm[ii] > Dmax:  # If depth is below vegetation maximum, there is no production
@@ -91,31 +155,7 @@ def evolvemarsh(
             distance = 1  # [m]
             C[xx] = C_e
 
-    floodfraction = np.sum(time_submerged, axis=0) / P  # Portion of the tidal cycle that each point is submerged
-
-    for i in range(1, numiterations):
-        tempdepth = depth[i, :]
-        tempy = np.zeros([L])
-        tempy[tempdepth > 0] = C[tempdepth > 0] * ws * dt  # [kg] mass of mineral sediment deposited, where depth > 0
-        sedimentcycle[i, :] = tempy
-
-    susp_dep = np.sum(sedimentcycle, axis=0) * timestep * 1000  # [g/yr] suspended sediment deposition in an entire year, in each cell
-
-    if plot:
-        plt.figure()
-        plt.subplot(3, 1, 1)
-        plt.plot(np.transpose(sedimentcycle))
-        plt.xlabel("Distance Across Marsh [m]")
-        plt.ylabel("Mineral Sediment Deposited Per Cycle [g/cycle]")
-        plt.subplot(3, 1, 2)
-        plt.plot(C)
-        plt.xlabel("Distance Across Marsh [m]")
-        plt.ylabel("Suspended Sediment Concentration [kg/m3]")
-        plt.subplot(3, 1, 3)
-        plt.plot(susp_dep)
-        plt.xlabel("Distance Across Marsh [m]")
-        plt.ylabel("Suspended Sediment Deposition [g/yr]")
-        plt.show()
+    susp_dep = C * ws * dt * submerged * timestep * 1000  # [g/yr] suspended sediment deposition in an entire year, in each cell: mass of mineral sediment deposited per iteration where depth > 0, times the number of flooded iterations
 
     mineral = susp_dep * (1 - OCb)  # [g] Mineral deposition of suspended sediment in a given year is equal determined by the organic content of the bay sediment
     organic_alloch = susp_dep * OCb  # [g] Organic deposition of suspended sediment is equal determined by the organic content of bay sed
@@ -130,11 +170,13 @@ def evolvemarsh(
     # Calculate thickness of new sediment (mineral+organic) based off LOI and its effect on density
     loi = (organic_autoch + organic_alloch) / (mineral + organic_autoch + organic_alloch)
     density = 1 / ((loi / rhoo) + ((1 - loi) / rhos)) * 1000  # [g/m3] Bulk density is calculated according to Morris et al. (2016)
-    density[np.isnan(density)] = 1  # If there is zero deposition, loi calculation will divide by zero and make density nan. Set density equal to 1 in this case, so that accretion is zero, instead of nan.
+    for xx in range(L):
+        if np.isnan(density[xx]):
+            density[xx] = 1  # If there is zero deposition, loi calculation will divide by zero and make density nan. Set density equal to 1 in this case, so that accretion is zero, instead of nan.
 
     accretion = (mineral + organic_autoch + organic_alloch) / density  # [m] accretion in a given year
 
     # Update elevation
     marshelevation += accretion
 
-    return marshelevation, organic_autoch, organic_alloch, mineral, Fm_min, Fm_org, bgb, accretion, agb
+    return marshelevation, organic_autoch, organic_alloch, mineral, Fm_min, Fm_org, bgb, accretion, agb, C, susp_dep
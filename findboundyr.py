@@ -0,0 +1,17 @@
+"""----------------------------------------------------------------------
+PyBMFT-C: Bay-Marsh-Forest Transect Carbon Model (Python version)
+----------------------------------------------------------------------"""
+
+from numba import njit
+
+
+@njit(cache=True)
+def findboundyr(elevation, bay_el):
+    """Finds the year following the most recent year in which the elevation history of a cell (elevation, one entry per year) lies below the depth of erosion
+    (bay_el), i.e. the year in which the cell has just risen above the bay bottom. Returns 0 if the cell has never been below the depth of erosion, including
+    when there is no elevation history yet (yr == 0)."""
+
+    for i in range(len(elevation) - 1, -1, -1):  # Scan backwards from the most recent year and stop at the first year below the depth of erosion
+        if elevation[i] < bay_el:
+            return i + 1
+    return 0
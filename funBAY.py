@@ -6,8 +6,10 @@ Last updated _20 August 2021_ by _IRB Reeves_
 
 import numpy as np
 import math
+from numba import njit
 
 
+@njit(cache=True)
 def funBAY(t,
            X,
            rhos,
@@ -27,10 +29,11 @@ def funBAY(t,
            dmo,
            rhob,
            rhom,
-           self
+           db
            ):
     """Determines change in bay depth and width by solving mass balance between fluxes of sediment into and out of the bay from marsh edge erosion, tidal exchange with the
-    outside sediment source, and sediment deposited onto the marsh surface """
+    outside sediment source, and sediment deposited onto the marsh surface. Also returns the SSC at the marsh edge (C_e, kg/m3) and the tidal exchange mass flux (Fc, kg/s)
+    for use in the marsh model, and an overflow code (0: none, 1: scarp height overflow, 2: wave power overflow) that is reported by solveBAY."""
 
     # Dynamic Variable X
     fetch = X[0]  # Mudflat width
@@ -45,18 +48,17 @@ def funBAY(t,
     tau = max((tw - tcr) / tcr, 0) * lamda  # Excess shear stress, dimensionless
     Cr = rhos * tau / (1 + tau)  # Reference suspended sediment concentration in the basin [kg/m3]
 
-    try:
-        hb = dm + (df - dm) * (1 - math.exp(-dist * 0.1 / df))  # [m] scarp height at a fixed distance from the marsh according to semi-empirical shoaling profile
-    except OverflowError:
-        print("  <-- hb error, dm:", dm, ", df:", df)
-        df = self.db
+    hb = dm + (df - dm) * (1 - math.exp(-dist * 0.1 / df))  # [m] scarp height at a fixed distance from the marsh according to semi-empirical shoaling profile
+    overflow = 0
+    if not math.isfinite(hb):  # Overflow: fall back to the bay depth at the start of the time step
+        overflow = 1
+        df = db
         hb = dm + (df - dm) * (1 - math.exp(-dist * 0.1 / df))
 
-    try:
-        W = waveTRNS(amp, wind, fetch, hb)  # [W] Wave power density at the marsh boundary
-    except OverflowError:
-        print("  <-- W overflow error, dm:", dm, ", df:", df)
-        df = self.db
+    W = waveTRNS(amp, wind, fetch, hb)  # [W] Wave power density at the marsh boundary
+    if not math.isfinite(W):
+        overflow = 2
+        df = db
         hb = dm + (df - dm) * (1 - math.exp(-dist * 0.1 / df))
         W = waveTRNS(amp, wind, fetch, hb)
 
@@ -64,17 +66,197 @@ def funBAY(t,
 
     Fc = (Cr - Co) * (fac * 2 * amp) / P / rhob  # (m2/s) Net flux of sediment lost or gained through tidal exchange with external sediment supply/sink
 
-    # IR 5July21: Global variables! Could be improved by passing the information in a non-global way
-    self._Fc_ODE.append(Fc * rhob * fetch)  # Save Fc as a mass flux (kg/s) for each iteration of the ODE
-    self._C_e_ODE.append(Cr)  # Save C_e (SSC at marsh edge, kg/m3) for each iteration of the ODE to use in marsh model
-
-    dX = np.zeros([2])
+    dX = np.zeros(2)
     dX[0] = E  # [m2/s, or m/s if integrated over 1m transect width] Change in bay width due to erosion
     dX[1] = -E * (df - dm) / fetch + Fm2 / fetch / rhos + Fc + RSLR  # [m/s] Change in bay depth due to mass balance between fluxes into and out of bay
 
-    return dX
+    return dX, Cr, Fc * rhob * fetch, overflow
+
+
+@njit(cache=True)
+def funBAY_jac(t,
+               X,
+               rhos,
+               P,
+               B,
+               wsf,
+               tcr,
+               Co,
+               wind,
+               Ba,
+               Be,
+               amp,
+               RSLR,
+               Fm2,
+               lamda,
+               dist,
+               dmo,
+               rhob,
+               rhom,
+               db
+               ):
+    """Calculates the analytic 2x2 Jacobian of funBAY with respect to bay fetch and depth. The mass balance of funBAY is evaluated on dual numbers (value, derivative
+    with respect to fetch, derivative with respect to depth), so the chain rule is carried through the wave height and period, wave number, wave shear stress, and
+    wave power calculations, at about the cost of a single evaluation of funBAY."""
+
+    # Dynamic Variable X
+    fetch = (X[0], 1.0, 0.0)  # Mudflat width
+    df = (X[1], 0.0, 1.0)  # Mudflat depth
+
+    if df[0] / (2 * amp) < 1:
+        fac = _dscale(df, 1 / (2 * amp))  # Proportion of tide that the bay is flooded, dimensionless
+    else:
+        fac = (1.0, 0.0, 0.0)
+    Df = _dsub(df, _dscale(fac, amp))  # [m] Average bay depth over tidal cycle
+    dm = dmo  # [m] Marsh edge depth
+
+    tw = _wavetau_d(fetch, wind, Df)  # Wave bed shear stress [Pa]
+
+    if (tw[0] - tcr) / tcr > 0:
+        tau = _dscale(_dshift(tw, -tcr), lamda / tcr)  # Excess shear stress, dimensionless
+    else:
+        tau = (0.0, 0.0, 0.0)
+    Cr = _dscale(_ddiv(tau, _dshift(tau, 1)), rhos)  # Reference suspended sediment concentration in the basin [kg/m3]
+
+    hb = _dshift(_dmul(_dshift(df, -dm), _dshift(_dscale(_dexp(_ddiv((-dist * 0.1, 0.0, 0.0), df)), -1), 1)), dm)  # [m] Scarp height
+    W = (math.inf, 0.0, 0.0)
+    if math.isfinite(hb[0]):
+        W = _waveTRNS_d(amp, wind, fetch, hb)  # [W] Wave power density at the marsh boundary
+    if not (math.isfinite(hb[0]) and math.isfinite(W[0])):  # Overflow: funBAY falls back to the (constant) bay depth at the start of the time step
+        df = (db, 0.0, 0.0)
+        hb = (dm + (db - dm) * (1 - math.exp(-dist * 0.1 / db)), 0.0, 0.0)
+        W = _waveTRNS_d(amp, wind, fetch, hb)
+
+    E = _dsub(_dscale(_ddiv(W, _dshift(hb, -dm)), Be), _dscale(Cr, Ba * wsf / rhom))  # (m2/s) Net flux of sediment eroded from/deposited to the marsh edge
+
+    Fc = _dscale(_dmul(_dshift(Cr, -Co), fac), 2 * amp / P / rhob)  # (m2/s) Net flux of sediment through tidal exchange
+
+    dX1 = _dsub(_ddiv((Fm2 / rhos, 0.0, 0.0), fetch), _dsub(_ddiv(_dmul(E, _dshift(df, -dm)), fetch), Fc))  # [m/s] Change in bay depth (RSLR is constant)
+
+    J = np.empty((2, 2))
+    J[0, 0] = E[1]
+    J[0, 1] = E[2]
+    J[1, 0] = dX1[1]
+    J[1, 1] = dX1[2]
+
+    return J
+
+
+@njit(cache=True)
+def solveBAY(to,
+             X0,
+             atol,
+             rtol,
+             C_e_trace,
+             Fc_trace,
+             rhos,
+             P,
+             B,
+             wsf,
+             tcr,
+             Co,
+             wind,
+             Ba,
+             Be,
+             amp,
+             RSLR,
+             Fm2,
+             lamda,
+             dist,
+             dmo,
+             rhob,
+             rhom,
+             db
+             ):
+    """Integrates funBAY over the time span to = [t0, t1] with an adaptive, linearly-implicit Rosenbrock 2(3) method (Shampine and Reichelt, 1997; the scheme behind
+    Matlab's ode23s). C_e (kg/m3) and Fc (kg/s) at t0 and each accepted step are written to the start of the
+    preallocated buffers C_e_trace and Fc_trace, which are only reallocated (doubled) if the solver takes more steps than they can hold. Returns the bay fetch and
+    depth at t1, the trace buffers, the number of entries written, and a success flag that is False if the integration produced non-finite values or failed to
+    converge."""
+
+    d = 1 / (2 + math.sqrt(2))
+    e32 = 6 + math.sqrt(2)
+    max_steps = 100000
+
+    t = to[0]
+    t_end = to[-1]
+    y = X0.copy()
+    h = (t_end - t) / 100  # Initial step, refined by error control
+    F0, C_e_trace[0], Fc_trace[0], overflow = funBAY(t, y, rhos, P, B, wsf, tcr, Co, wind, Ba, Be, amp, RSLR, Fm2, lamda, dist, dmo, rhob, rhom, db)
+    n = 1
+    _report_overflow(overflow, dmo, y[1])
+
+    for _ in range(max_steps):
+        if t >= t_end:
+            return y, C_e_trace, Fc_trace, n, True
+        if not (np.isfinite(y).all() and np.isfinite(F0).all()):
+            break
+        h = min(h, t_end - t)
+
+        J = funBAY_jac(t, y, rhos, P, B, wsf, tcr, Co, wind, Ba, Be, amp, RSLR, Fm2, lamda, dist, dmo, rhob, rhom, db)
+
+        overflow = 0  # Overflow in funBAY over all attempts of this step, reported once per step
+        while True:
+            # Inverse of W = I - h * d * J
+            a11 = 1 - h * d * J[0, 0]
+            a12 = -h * d * J[0, 1]
+            a21 = -h * d * J[1, 0]
+            a22 = 1 - h * d * J[1, 1]
+            det = a11 * a22 - a12 * a21
+            Wi = np.array([[a22, -a12], [-a21, a11]]) / det
+
+            k1 = Wi @ F0
+            F1, _, _, overflow1 = funBAY(t + 0.5 * h, y + 0.5 * h * k1, rhos, P, B, wsf, tcr, Co, wind, Ba, Be, amp, RSLR, Fm2, lamda, dist, dmo, rhob, rhom, db)
+            k2 = Wi @ (F1 - k1) + k1
+            ynew = y + h * k2
+            F2, C_e, Fc, overflow2 = funBAY(t + h, ynew, rhos, P, B, wsf, tcr, Co, wind, Ba, Be, amp, RSLR, Fm2, lamda, dist, dmo, rhob, rhom, db)
+            overflow = max(overflow, overflow1, overflow2)
+            k3 = Wi @ (F2 - e32 * (k2 - F1) - 2 * (k1 - F0))
+
+            # Error estimate relative to the mixed absolute/relative tolerance
+            err = 0.0
+            for i in range(2):
+                scale = atol + rtol * max(abs(y[i]), abs(ynew[i]))
+                err = max(err, abs(h / 6 * (k1[i] - 2 * k2[i] + k3[i])) / scale)
+
+            if not math.isfinite(err):
+                h *= 0.2
+            elif err <= 1:
+                break
+            else:
+                h *= max(0.2, 0.8 * err ** (-1 / 3))
+            if h < 1e-10 * abs(t_end):  # Step size underflow
+                _report_overflow(overflow, dmo, y[1])
+                return y, C_e_trace, Fc_trace, n, False
+        _report_overflow(overflow, dmo, y[1])
+
+        t += h
+        y = ynew
+        F0 = F2
+
+        if n == C_e_trace.size:  # Grow trace storage
+            C_e_trace = np.concatenate((C_e_trace, np.empty(n)))
+            Fc_trace = np.concatenate((Fc_trace, np.empty(n)))
+        C_e_trace[n] = C_e
+        Fc_trace[n] = Fc
+        n += 1
+
+        h *= min(5, 0.8 * max(err, 1e-10) ** (-1 / 3))
+
+    return y, C_e_trace, Fc_trace, n, False
+
+
+@njit(cache=True)
+def _report_overflow(overflow, dm, df):
+    """Prints the overflow reported by funBAY during a step of solveBAY"""
+
+    if overflow == 1:
+        print("  <-- hb error, dm:", dm, ", df:", df)
+    elif overflow == 2:
+        print("  <-- W overflow error, dm:", dm, ", df:", df)
 
 
+@njit(cache=True)
 def wavetau(fetch, wind, Df):
     """Calculates wave bed shear stress, as a function of fetch, wind speed, and bay depth. From Mariotti and Fagherazzi (2013)."""
 
@@ -89,6 +271,7 @@ def wavetau(fetch, wind, Df):
     return tw
 
 
+@njit(cache=True)
 def YeV(fetch, wind, h):
     """Calculates wave height (Hs) and period (Tp) for a given fetch, wind speed, and depth; based on a set of semi-empirical equations from Young and Verhagen (1996). """
 
@@ -104,6 +287,7 @@ def YeV(fetch, wind, h):
     return Hs, Tp
 
 
+@njit(cache=True)
 def wavek(F, H):
     """Computes wave number via dispersion relationship. Copyright (C) 2001, Lee Gordon, NortekUSA LLC
 
@@ -130,6 +314,7 @@ def wavek(F, H):
     return K
 
 
+@njit(cache=True)
 def waveTRNS(amp, wind, fetch, hb):
     """Calculates wave power density at marsh boundary. From Mariotti and Carr (2014)."""
 
@@ -144,10 +329,144 @@ def waveTRNS(amp, wind, fetch, hb):
     return W
 
 
-def POOLstopp5(t, X):
-    B = 10000 * 0.999
-    isterminal = [1, 1, 1, 1]  # Stop the integration when value = 0  # IR 15Jun21: commented out because input into Python ODE solver not presently working
-    direction = [0, 1, 1, 0]  # 0 = negative direction  # IR 15Jun21: commented out because input into Python ODE solver not presently working
-    value = [X[0] - 1, X[0] - B, X[1] - 0.00, X[1] - 0.00]
+# Derivative-carrying versions of the wave calculations used by funBAY_jac. Each quantity is a dual number (value, derivative with respect to fetch, derivative
+# with respect to bay depth); the value expressions mirror wavetau, YeV, wavek, and waveTRNS above.
+
+@njit(cache=True)
+def _wavetau_d(fetch, wind, Df):
+    """Dual-number version of wavetau"""
+
+    (Hs, Tp) = _YeV_d(fetch, wind, Df)
+    kk = _wavek_d(_ddiv((1.0, 0.0, 0.0), Tp), Df)
+    Um = _ddiv(_dscale(_ddiv(Hs, Tp), math.pi), _dsinh(_dmul(kk, Df)))
+    aw = _dscale(_dmul(Tp, Um), 1 / (2 * math.pi))
+    ko = 0.001
+    fw = _dscale(_dpow(_dscale(aw, 1 / ko), -0.75), 0.4)
+    tw = _dscale(_dmul(fw, _dmul(Um, Um)), 1 / 2 * 1020)
+
+    return tw
+
+
+@njit(cache=True)
+def _YeV_d(fetch, wind, h):
+    """Dual-number version of YeV"""
+
+    g = 9.8
+    delta = _dscale(h, g / wind ** 2)
+    chi = _dscale(fetch, g / wind ** 2)
+    A = _dtanh(_dscale(_dpow(delta, 0.75), 0.493))
+    epsilon = _dscale(_dpow(_dmul(A, _dtanh(_ddiv(_dscale(_dpow(chi, 0.57), 3.13e-3), A))), 1.74), 3.64e-3)
+    A2 = _dtanh(_dscale(_dpow(delta, 1.01), 0.331))
+    ni = _dscale(_dpow(_dmul(A2, _dtanh(_ddiv(_dscale(_dpow(chi, 0.73), 5.215e-4), A2))), -0.37), 0.133)
+    Tp = _ddiv((wind / g, 0.0, 0.0), ni)
+    Hs = _dscale(_dsqrt(epsilon), 4 * wind ** 2 / g)  # 4 * sqrt(wind ** 4 * epsilon / g ** 2)
+
+    return Hs, Tp
+
+
+@njit(cache=True)
+def _wavek_d(F, H):
+    """Dual-number version of wavek"""
+
+    g = 9.80171
+
+    e1 = _dscale(_dmul(_dmul(F, F), H), 4 * math.pi ** 2 / g)
+    K1 = _ddiv(_dsqrt(_wavek_e3(e1)), H)
+
+    o1sq = _dscale(_dmul(K1, _dtanh(_dmul(K1, H))), g)
+    e1 = _dscale(_dmul(o1sq, H), 1 / g)
+    K2 = _ddiv(_dsqrt(_wavek_e3(e1)), H)
+
+    return _dsub(_dscale(K1, 2), K2)
+
+
+@njit(cache=True)
+def _wavek_e3(e1):
+    """Dual-number version of the e3 term of the dispersion approximation in wavek"""
+
+    x = e1[0]
+    e2 = 1 + 0.6666666 * x + 0.355555555 * x ** 2 + 0.1608465608 * x ** 3 + 0.0632098765 * x ** 4 + 0.0217540484 * x ** 5 + 0.0065407983 * x ** 6
+    de2 = 0.6666666 + 2 * 0.355555555 * x + 3 * 0.1608465608 * x ** 2 + 4 * 0.0632098765 * x ** 3 + 5 * 0.0217540484 * x ** 4 + 6 * 0.0065407983 * x ** 5
+    de3 = 2 * x + (e2 - x * de2) / e2 ** 2
+
+    return x ** 2 + x / e2, de3 * e1[1], de3 * e1[2]
+
+
+@njit(cache=True)
+def _waveTRNS_d(amp, wind, fetch, hb):
+    """Dual-number version of waveTRNS"""
+
+    if hb[0] / (2 * amp) < 1:
+        fac = _dscale(hb, 1 / (2 * amp))
+    else:
+        fac = (1.0, 0.0, 0.0)
+    D = _dsub(hb, _dscale(fac, amp))
+    (Hs, Tp) = _YeV_d(fetch, wind, D)
+    kk = _wavek_d(_ddiv((1.0, 0.0, 0.0), Tp), D)
+    kD2 = _dscale(_dmul(kk, D), 2)
+    cg = _dmul(_dscale(_ddiv((1.0, 0.0, 0.0), _dmul(kk, Tp)), math.pi), _dshift(_ddiv(kD2, _dsinh(kD2)), 1))
+    W = _dscale(_dmul(cg, _dmul(Hs, Hs)), 9800 / 16)
+
+    return W
+
+
+@njit(cache=True)
+def _dadd(a, b):
+    return a[0] + b[0], a[1] + b[1], a[2] + b[2]
+
+
+@njit(cache=True)
+def _dsub(a, b):
+    return a[0] - b[0], a[1] - b[1], a[2] - b[2]
+
+
+@njit(cache=True)
+def _dmul(a, b):
+    return a[0] * b[0], a[1] * b[0] + a[0] * b[1], a[2] * b[0] + a[0] * b[2]
+
+
+@njit(cache=True)
+def _ddiv(a, b):
+    v = a[0] / b[0]
+    return v, (a[1] - v * b[1]) / b[0], (a[2] - v * b[2]) / b[0]
+
+
+@njit(cache=True)
+def _dscale(a, c):
+    return a[0] * c, a[1] * c, a[2] * c
+
+
+@njit(cache=True)
+def _dshift(a, c):
+    return a[0] + c, a[1], a[2]
+
+
+@njit(cache=True)
+def _dpow(a, p):
+    d = p * a[0] ** (p - 1)
+    return a[0] ** p, d * a[1], d * a[2]
+
+
+@njit(cache=True)
+def _dsqrt(a):
+    v = math.sqrt(a[0])
+    return v, a[1] / (2 * v), a[2] / (2 * v)
+
+
+@njit(cache=True)
+def _dexp(a):
+    v = math.exp(a[0])
+    return v, v * a[1], v * a[2]
+
+
+@njit(cache=True)
+def _dtanh(a):
+    v = math.tanh(a[0])
+    d = 1 - v * v
+    return v, d * a[1], d * a[2]
+
 
-    return value  # , isterminal, direction
+@njit(cache=True)
+def _dsinh(a):
+    d = math.cosh(a[0])
+    return math.sinh(a[0]), d * a[1], d * a[2]
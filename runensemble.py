@@ -0,0 +1,39 @@
+"""----------------------------------------------------------------------
+PyBMFT-C: Bay-Marsh-Forest Transect Carbon Model (Python version)
+----------------------------------------------------------------------"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numba
+
+from bmftc import Bmftc
+
+
+def run_ensemble(configs, max_workers=None):
+    """Runs an ensemble of independent PyBMFT-C simulations (e.g., a sweep over RSLR, reference concentration, or wind speed) in parallel across processes.
+    configs is a list of dicts of Bmftc keyword arguments, one per simulation. Returns the list of completed Bmftc instances, in the same order as configs.
+
+    Workers are started with the spawn method, because forking a process in which numba's parallel threads are already running can deadlock; scripts calling
+    run_ensemble should therefore guard their entry point with if __name__ == "__main__"."""
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker) as executor:
+        return list(executor.map(_run_one, configs))
+
+
+def _init_worker():
+    """Limits each worker process to a single numba thread, so the parallel kernels (e.g., updateforest) of concurrent simulations do not oversubscribe the cores"""
+
+    numba.set_num_threads(1)
+
+
+def _run_one(config):
+    """Creates a Bmftc instance from a dict of keyword arguments and runs it to the end of the simulation, or until one of its end conditions is met"""
+
+    bmftc = Bmftc(**config)
+    for time_step in range(int(bmftc.dur)):
+        bmftc.update()
+        if bmftc.drown_break == 1:
+            break
+
+    return bmftc
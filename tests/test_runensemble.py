@@ -0,0 +1,54 @@
+import copy
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bmftc import Bmftc  # noqa: E402
+from runensemble import run_ensemble, _run_one  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def run_in_repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)  # Input files are read relative to the main PyBMFT-C directory
+
+
+def _assert_same_state(a, b):
+    np.testing.assert_array_equal(a.elevation, b.elevation)
+    np.testing.assert_array_equal(a.organic_dep_autoch, b.organic_dep_autoch)
+    np.testing.assert_array_equal(a.organic_dep_alloch, b.organic_dep_alloch)
+    np.testing.assert_array_equal(a.mineral_dep, b.mineral_dep)
+    np.testing.assert_array_equal(a.fluxes, b.fluxes)
+
+
+@pytest.mark.parametrize("clone", [lambda m: pickle.loads(pickle.dumps(m)), copy.deepcopy])
+def test_update_continues_after_copy(clone):
+    model = Bmftc(time_step_count=8)
+    for _ in range(3):
+        model.update()
+
+    copied = clone(model)
+    assert np.shares_memory(copied.mineral_dep, copied.organic_dep_autoch) is False
+    assert np.shares_memory(copied.mineral_dep, copied._deposition)
+
+    for _ in range(5):
+        model.update()
+        copied.update()
+
+    _assert_same_state(model, copied)
+
+
+def test_run_ensemble_matches_sequential_runs():
+    configs = [dict(time_step_count=4, relative_sea_level_rise=rslr, forest_on=False) for rslr in (4, 8)]
+
+    ensemble = run_ensemble(configs, max_workers=2)
+
+    assert len(ensemble) == len(configs)
+    for model, config in zip(ensemble, configs):
+        assert np.shares_memory(model.mineral_dep, model._deposition)
+        _assert_same_state(model, _run_one(config))
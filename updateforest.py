@@ -0,0 +1,40 @@
+"""----------------------------------------------------------------------
+PyBMFT-C: Bay-Marsh-Forest Transect Carbon Model (Python version)
+----------------------------------------------------------------------"""
+
+from numba import njit, prange
+
+
+@njit(cache=True, parallel=True)
+def updateforest(
+        organic_dep_autoch,
+        mineral_dep,
+        forestOM,
+        forestMIN,
+        B_rts,
+        forest_edge_prev,
+        x_f,
+        B,
+        startyear,
+        yr,
+        forestage,
+):
+    """Sets the soil organic and mineral matter profile of the top 25 layers of the spinup stratigraphy in each forest cell from the look-up tables for a forest of the
+    given age. Cells are independent, so each loop runs in parallel across cells."""
+
+    spinlast25 = startyear - 25
+    if forestage < 80:
+        age = yr - spinlast25  # Column of the look-up tables for the current forest age
+    else:
+        age = 79
+
+    # Cells that were forest in the previous year, up to the current forest edge: include root biomass
+    for x in prange(forest_edge_prev, x_f + 1):
+        for i in range(25):
+            organic_dep_autoch[spinlast25 + i, x] = forestOM[i, age] + B_rts[i, age]
+
+    # Current forest
+    for x in prange(x_f, B):
+        for i in range(25):
+            organic_dep_autoch[spinlast25 + i, x] = forestOM[i, age]
+            mineral_dep[spinlast25 + i, x] = forestMIN[i, age]